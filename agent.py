@@ -1,10 +1,131 @@
-from langchain_experimental.tools import PythonREPLTool
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+import asyncio
+import atexit
+import hashlib
+import queue
+import threading
+from collections import deque
+from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+import numpy as np
 import pandas as pd
 import os
-from typing import List, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from cache import SemanticCache
+from kernel import PythonKernel
+
+
+# Output AgentExecutor returns when it hits max_iterations without an answer
+STOPPED_OUTPUT_PREFIX = "Agent stopped due to"
+
+# Imports executed once in the Python kernel so tool calls do not pay for them
+# on every step
+WARM_IMPORTS = """
+import numpy as np
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+from repl_helpers import njit, prange, pairwise_corr, group_agg, numeric_matrix
+"""
+
+# Invariant system instructions, kept first so the prompt prefix is identical
+# across calls and can be served from the provider's prompt cache
+STATIC_PREFIX = '''You are a data analysis assistant. Answer the user's questions about a CSV file as best you can.
+Use the Python tool to run code whenever you need to inspect or compute something; print any value you want to see.
+The Python tool keeps its state between calls. pd, np, plt, LogisticRegression, train_test_split and accuracy_score are already imported.
+Figures shown with plt.show() are saved as PNG files and the tool returns their paths; mention those paths in your answer.
+Numba's njit and prange are available. pairwise_corr(X) gives the correlation matrix of the columns of a 2D array, skipping NaN per pair like df.corr().
+For row-wise numeric loops over more than 100,000 rows, compile the loop with @njit for a large speedup.
+Never use iterrows/itertuples; use vectorized pandas/NumPy operations. group_agg(df, key, col, fn="mean") aggregates a column per group.
+X is a NumPy snapshot of the numeric columns of df as loaded; it is not updated when df changes. After modifying df, use numeric_matrix(df) for a current array.
+When you have enough information, reply with the final answer to the user's question.'''
+
+# Header printed by chat_stream before the streamed response
+RESPONSE_HEADER = "\n📊 Agent Response:"
+
+# Per-agent data description, placed after the static instructions
+DYNAMIC_SUFFIX = '''The CSV file {csv_file_path} is already loaded into a pandas DataFrame `df` in the Python tool; do NOT call read_csv.
+
+{schema_summary}'''
+
+
+class _TokenQueueHandler(BaseCallbackHandler):
+    """
+    Callback handler that forwards the streamed answer tokens to a queue.
+    
+    Tokens are buffered per model call and only forwarded when the call ends
+    without tool calls, so text the model writes before calling a tool is
+    never shown as part of the answer. Queue items are ("token", text) or
+    ("status", message) pairs, so the consumer can print status messages
+    apart from the answer.
+    """
+
+    def __init__(self, tokens: queue.Queue):
+        self.tokens = tokens
+        self.text = ""
+        self._buffers: Dict[Any, List[str]] = {}
+
+    def on_llm_new_token(self, token: str, *, run_id=None, **kwargs):
+        """Buffer each non-empty token of the model call."""
+        if token:
+            self._buffers.setdefault(run_id, []).append(token)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        """Forward the buffered tokens unless the model called a tool."""
+        buffered = self._buffers.pop(run_id, [])
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None and message.additional_kwargs.get("tool_calls"):
+                    return
+        for token in buffered:
+            self.text += token
+            self.tokens.put(("token", token))
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        """Drop the tokens of a failed model call."""
+        self._buffers.pop(run_id, None)
+
+    def status(self, message: str):
+        """Queue a status message for the consumer to print."""
+        self.tokens.put(("status", message))
+
+
+class EarlyStop(Exception):
+    """Raised when the agent repeats a recent action instead of making progress."""
+
+
+class EarlyStopHandler(BaseCallbackHandler):
+    """
+    Callback handler that stops the agent loop on repeated actions.
+    
+    Keeps the last few tool calls and raises EarlyStop when an incoming call
+    matches one of them, collecting tool observations along the way so a
+    final answer can still be produced.
+    """
+
+    raise_error = True
+
+    def __init__(self, window: int = 3):
+        self.recent_actions: Deque[Tuple[str, str]] = deque(maxlen=window)
+        self.observations: List[str] = []
+
+    def on_agent_action(self, action, **kwargs):
+        """Raise EarlyStop if the action repeats one of the recent actions."""
+        key = (action.tool, str(action.tool_input).strip())
+        if key in self.recent_actions:
+            raise EarlyStop(f"Repeated action: {action.tool}")
+        self.recent_actions.append(key)
+
+    def on_tool_end(self, output: str, **kwargs):
+        """Record the tool output."""
+        self.observations.append(str(output))
 
 
 class DataAnalysisAgent:
@@ -15,52 +136,84 @@ class DataAnalysisAgent:
     and provide insights based on user queries in natural language.
     """
     
-    def __init__(self, llm, csv_file_path: str):
+    def __init__(self, llm, csv_file_path: str, cache_path: str = "cache",
+                 history_window: int = 5, planner_llm=None, summary_llm=None,
+                 embeddings=None):
         """
         Initialize the Data Analysis Agent.
         
         Args:
-            llm: Language model instance (e.g., ChatOpenAI)
+            llm: Language model instance (e.g., ChatOpenAI), also used to
+                synthesize answers when the tool loop ends without one
             csv_file_path (str): Path to the CSV file to analyze
+            cache_path (str): Base path of the semantic response cache files
+            history_window (int): Number of recent turns kept verbatim before
+                they are compacted into a summary
+            planner_llm: Cheaper language model that drives the tool-calling
+                steps; defaults to llm
+            summary_llm: Cheap language model that compacts older turns;
+                defaults to gpt-4o-mini
+            embeddings: Embedding model used by the semantic cache; defaults
+                to text-embedding-3-small
         """
         self.llm = llm
+        self.planner_llm = planner_llm or llm
         self.csv_file_path = csv_file_path
-        self.chat_history: List[Tuple[str, str]] = []
+        self.history_window = history_window
+        self.chat_history: Deque[Tuple[str, str]] = deque()
+        self._summary = ""
+        self._history_messages: List[BaseMessage] = []
+        self._summary_lock: Optional[asyncio.Lock] = None
+        self._summary_lock_loop: Optional[asyncio.AbstractEventLoop] = None
 
-        # Initialize Python execution tool
-        self.python_tool = PythonREPLTool()
-        self.tools = [self.python_tool]
+        # Pending achat() results, so identical concurrent queries run once
+        self._inflight: Dict[str, asyncio.Future] = {}
 
-        # Build prompt template for ReAct pattern
-        self.prompt_template = PromptTemplate(
-            input_variables=["tools", "chat_history", "tool_names", "query", "agent_scratchpad"],
-            template='''Here is a CSV file located at {csv_file_path}. Please answer the following questions as best you can. You have access to the following tools:
+        # Cheap model used to compact older conversation turns
+        self.summary_llm = summary_llm or ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
-            {tools}
-
-            Chat history from previous conversations:
-            {chat_history}
+        # Semantic cache for repeated or paraphrased questions
+        self.embeddings = embeddings or OpenAIEmbeddings(model="text-embedding-3-small")
+        self.cache = SemanticCache(
+            embeddings=self.embeddings,
+            csv_file_path=csv_file_path,
+            cache_path=cache_path
+        )
 
-            Use the following format:
+        # Load the data once to describe its schema in the prompt
+        self.df = pd.read_csv(csv_file_path)
+        self.schema_summary = self._build_schema_summary()
 
-            Question: the input question you must answer
-            Thought: you should always think about what to do
-            Action: the action to take, should be one of [{tool_names}]
-            Action Input: the input to the action
-            Observation: the result of the action
-            ... (this Thought/Action/Action Input/Observation can be repeated zero or 3 times)
-            Thought: I now know the final answer
-            Final Answer: the final answer to the original input question
+        # Start a persistent Python kernel and warm it once; its state persists
+        # across queries so variables such as fitted models survive between
+        # questions. The kernel runs in the user's working directory, so saved
+        # files land there, with this module's directory on the import path.
+        self.kernel = PythonKernel()
+        atexit.register(self.close)
+        self._warm_kernel(
+            f"import sys\nsys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})",
+            WARM_IMPORTS,
+            f"df = pd.read_csv({os.path.abspath(csv_file_path)!r})\n"
+            "X = numeric_matrix(df)"
+        )
 
-            Begin!
+        # Initialize Python execution tool
+        self.python_tool = self.kernel.as_tool()
+        self.tools = [self.python_tool]
 
-            Question: {query}
-            {agent_scratchpad}'''
-        )
+        # Build chat prompt for tool calling. Tool schemas are sent through the
+        # tool-calling API, so they are not part of the prompt text.
+        self.prompt_template = ChatPromptTemplate.from_messages([
+            ("system", STATIC_PREFIX),
+            ("system", DYNAMIC_SUFFIX),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{query}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ])
 
-        # Create ReAct agent
-        self.agent = create_react_agent(
-            llm=self.llm,
+        # Create tool-calling agent
+        self.agent = create_openai_tools_agent(
+            llm=self.planner_llm,
             tools=self.tools,
             prompt=self.prompt_template
         )
@@ -70,25 +223,569 @@ class DataAnalysisAgent:
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            max_iterations=10,
+            max_iterations=5,
+            handle_parsing_errors=True
+        )
+
+        # Executor for streamed answers, whose step logs would interleave
+        # with the streamed tokens
+        self.stream_executor = AgentExecutor(
+            agent=self.agent,
+            tools=self.tools,
+            verbose=False,
+            max_iterations=5,
             handle_parsing_errors=True
         )
 
-    def _get_tool_descriptions(self) -> str:
+    def _warm_kernel(self, *cells: str):
         """
-        Get descriptions of available tools.
+        Run setup code in the Python kernel.
+        
+        The kernel runs the same code again if it has to be restarted.
+        
+        Args:
+            *cells (str): Code cells to execute in order
+            
+        Raises:
+            RuntimeError: If a cell fails; the kernel is shut down first
+        """
+        output, ok = self.kernel.setup(*cells)
+        if not ok:
+            self.close()
+            raise RuntimeError(f"Failed to initialize the Python kernel: {output.strip()}")
+
+    def _build_schema_summary(self) -> str:
+        """
+        Describe the loaded DataFrame for the prompt.
         
         Returns:
-            str: Tool descriptions for the agent
+            str: Columns, dtypes and the first rows of the data
         """
-        return "Python_REPL: A Python shell. Use this to execute python commands. Input should be a valid python command. If you want to see the output of a value, you should print it out with `print(...)`."
+        return (
+            f"Columns: {list(self.df.columns)}\n"
+            f"Dtypes:\n{self.df.dtypes.to_string()}\n"
+            f"Head:\n{self.df.head().to_string()}"
+        )
+
+    def _build_inputs(self, query: str, with_history: bool = True) -> dict:
+        """
+        Build the agent input parameters for a query.
+        
+        Args:
+            query (str): User's natural language question about the data
+            with_history (bool): Whether to include the conversation history
+            
+        Returns:
+            dict: Input parameters for the agent executor
+        """
+        return {
+            "csv_file_path": self.csv_file_path,
+            "schema_summary": self.schema_summary,
+            "chat_history": self._format_history() if with_history else [],
+            "query": query,
+        }
+
+    def _synthesis_prompt(self, query: str, observations: List[str],
+                          with_history: bool = True) -> List[BaseMessage]:
+        """
+        Build the prompt used to answer from the observations of an unfinished run.
+        
+        The prompt carries the data schema and, if requested, the conversation
+        history, so follow-up questions are answered in context.
+        
+        Args:
+            query (str): User's natural language question about the data
+            observations (List[str]): Tool outputs collected before stopping
+            with_history (bool): Whether to include the conversation history
+            
+        Returns:
+            List[BaseMessage]: Answer prompt messages
+        """
+        joined = "\n".join(observations) if observations else "(none)"
+        return (
+            [SystemMessage(content=f"The CSV file {self.csv_file_path} has this data:\n{self.schema_summary}")]
+            + (self._format_history() if with_history else [])
+            + [HumanMessage(content=f"Given these observations:\n{joined}\n\nAnswer: {query}")]
+        )
+
+    def _run_agent(self, query: str, callbacks: Optional[List[Any]] = None,
+                   executor: Optional[AgentExecutor] = None,
+                   report: Callable[[str], None] = print) -> str:
+        """
+        Run the agent on a query, stopping early on repeated actions.
+        
+        If the run ends without a final answer, the main model answers once
+        from the collected tool observations.
+        
+        Args:
+            query (str): User's natural language question about the data
+            callbacks (Optional[List[Any]]): Extra callback handlers
+            executor (Optional[AgentExecutor]): Executor to run; defaults to
+                the verbose agent executor
+            report (Callable[[str], None]): Function that shows status messages
+            
+        Returns:
+            str: Agent's final answer
+        """
+        early_stop = EarlyStopHandler()
+        callbacks = [early_stop] + (callbacks or [])
+        executor = executor or self.agent_executor
+        try:
+            response = executor.invoke(
+                self._build_inputs(query),
+                config={"callbacks": callbacks}
+            )
+            if not response['output'].startswith(STOPPED_OUTPUT_PREFIX):
+                return response['output']
+            report("\n⚠️ Stopped early: iteration limit reached")
+        except EarlyStop as e:
+            report(f"\n⚠️ Stopped early: {str(e)}")
+
+        prompt = self._synthesis_prompt(query, early_stop.observations)
+        return self.llm.invoke(prompt, config={"callbacks": callbacks[1:]}).content
+
+    async def _arun_agent(self, query: str, with_history: bool = True) -> str:
+        """
+        Asynchronously run the agent on a query, stopping early on repeated actions.
+        
+        If the run ends without a final answer, the main model answers once
+        from the collected tool observations.
+        
+        Args:
+            query (str): User's natural language question about the data
+            with_history (bool): Whether to include the conversation history
+            
+        Returns:
+            str: Agent's final answer
+        """
+        early_stop = EarlyStopHandler()
+        try:
+            response = await self.agent_executor.ainvoke(
+                self._build_inputs(query, with_history),
+                config={"callbacks": [early_stop]}
+            )
+            if not response['output'].startswith(STOPPED_OUTPUT_PREFIX):
+                return response['output']
+            print("\n⚠️ Stopped early: iteration limit reached")
+        except EarlyStop as e:
+            print(f"\n⚠️ Stopped early: {str(e)}")
+
+        result = await self.llm.ainvoke(
+            self._synthesis_prompt(query, early_stop.observations, with_history)
+        )
+        return result.content
+
+    def _standalone_prompt(self, query: str) -> List[BaseMessage]:
+        """
+        Build the prompt used to rewrite a follow-up as a standalone question.
+        
+        Args:
+            query (str): User's natural language question about the data
+            
+        Returns:
+            List[BaseMessage]: Rewrite prompt messages
+        """
+        return self._format_history() + [HumanMessage(content=(
+            "Rewrite the question below so it can be understood without the "
+            "conversation above. Keep its meaning; if it is already "
+            "self-contained, return it unchanged. Reply with the question only.\n\n"
+            f"Question: {query}"
+        ))]
+
+    def _cache_key(self, query: str) -> Optional[str]:
+        """
+        Get the question under which the answer to a query is cached.
+        
+        Cached answers must not depend on conversation context, so with
+        history the query is first rewritten as a standalone question.
+        
+        Args:
+            query (str): User's natural language question about the data
+            
+        Returns:
+            Optional[str]: Cache key, or None if the rewrite failed
+        """
+        if not self._history_messages:
+            return query
+        try:
+            return self.summary_llm.invoke(self._standalone_prompt(query)).content.strip() or None
+        except Exception as e:
+            print(f"\n⚠️ Skipping cache: failed to rewrite the question: {str(e)}")
+            return None
+
+    async def _acache_key(self, query: str, with_history: bool = True) -> Optional[str]:
+        """
+        Asynchronously get the question under which the answer to a query is cached.
+        
+        Args:
+            query (str): User's natural language question about the data
+            with_history (bool): Whether the query uses the conversation history
+            
+        Returns:
+            Optional[str]: Cache key, or None if the rewrite failed
+        """
+        if not with_history or not self._history_messages:
+            return query
+        try:
+            result = await self.summary_llm.ainvoke(self._standalone_prompt(query))
+            return result.content.strip() or None
+        except Exception as e:
+            print(f"\n⚠️ Skipping cache: failed to rewrite the question: {str(e)}")
+            return None
+
+    def _lookup_cache(self, query: str) -> Tuple[Optional[str], Optional[np.ndarray], Optional[str]]:
+        """
+        Look up the cached answer of a query.
+        
+        Args:
+            query (str): User's natural language question about the data
+            
+        Returns:
+            Tuple[Optional[str], Optional[np.ndarray], Optional[str]]: Cache
+                key, its embedding if computed, and the cached answer. Without
+                an embedding the answer is not added to the cache.
+        """
+        key = self._cache_key(query)
+        if key is None:
+            return None, None, None
+        cached = self.cache.lookup_exact(key)
+        if cached is not None:
+            return key, None, cached
+        try:
+            embedding = self.cache.embed(key)
+        except Exception as e:
+            # The cache is best-effort; the agent still answers the query
+            print(f"\n⚠️ Skipping cache: failed to embed the question: {str(e)}")
+            return key, None, None
+        return key, embedding, self.cache.lookup(embedding, key)
+
+    async def _alookup_cache(self, query: str, with_history: bool = True
+                             ) -> Tuple[Optional[str], Optional[np.ndarray], Optional[str]]:
+        """
+        Asynchronously look up the cached answer of a query.
+        
+        Args:
+            query (str): User's natural language question about the data
+            with_history (bool): Whether the query uses the conversation history
+            
+        Returns:
+            Tuple[Optional[str], Optional[np.ndarray], Optional[str]]: Cache
+                key, its embedding if computed, and the cached answer
+        """
+        key = await self._acache_key(query, with_history)
+        if key is None:
+            return None, None, None
+        cached = self.cache.lookup_exact(key)
+        if cached is not None:
+            return key, None, cached
+        try:
+            embedding = await self.cache.aembed(key)
+        except Exception as e:
+            # The cache is best-effort; the agent still answers the query
+            print(f"\n⚠️ Skipping cache: failed to embed the question: {str(e)}")
+            return key, None, None
+        return key, embedding, self.cache.lookup(embedding, key)
+
+    def _format_history(self) -> List[BaseMessage]:
+        """
+        Get the conversation summary and recent turns as prompt messages.
+        
+        Returns:
+            List[BaseMessage]: Chat history messages for the agent
+        """
+        return list(self._history_messages)
+
+    def _rebuild_history_messages(self):
+        """Rebuild the prompt messages from the summary and recent turns."""
+        messages: List[BaseMessage] = []
+        if self._summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{self._summary}"))
+        for q, a in self.chat_history:
+            messages.append(HumanMessage(content=q))
+            messages.append(AIMessage(content=a))
+        self._history_messages = messages
+
+    def _append_turn(self, query: str, answer: str):
+        """Append a turn to the history and its prompt messages."""
+        self.chat_history.append((query, answer))
+        self._history_messages.append(HumanMessage(content=query))
+        self._history_messages.append(AIMessage(content=answer))
+
+    def _trim_history(self):
+        """Drop the oldest turns beyond the window when they cannot be summarized."""
+        while len(self.chat_history) > self.history_window:
+            self.chat_history.popleft()
+        self._rebuild_history_messages()
+
+    def _summary_prompt(self, turns: List[Tuple[str, str]]) -> str:
+        """
+        Build the prompt used to compact turns into the summary.
+        
+        Args:
+            turns (List[Tuple[str, str]]): (question, answer) pairs to summarize
+            
+        Returns:
+            str: Summarization prompt
+        """
+        lines = "\n".join(f"Q: {q}\nA: {a}" for q, a in turns)
+        prompt = f"Summarize the following Q/A pairs in 3 sentences:\n{lines}"
+        if self._summary:
+            prompt = f"Summary of the earlier conversation:\n{self._summary}\n\n{prompt}"
+        return prompt
+
+    def _apply_summary(self, turns: List[Tuple[str, str]], summary: str):
+        """
+        Replace summarized turns with their summary.
+        
+        Only the given turns are removed; turns added while the summary was
+        being generated stay in the history.
+        
+        Args:
+            turns (List[Tuple[str, str]]): Turns covered by the summary
+            summary (str): New conversation summary
+        """
+        summarized = {id(turn) for turn in turns}
+        self._summary = summary
+        self.chat_history = deque(
+            turn for turn in self.chat_history if id(turn) not in summarized
+        )
+        self._rebuild_history_messages()
+
+    def _get_summary_lock(self) -> asyncio.Lock:
+        """Get the lock serializing async compaction on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._summary_lock_loop is not loop:
+            self._summary_lock = asyncio.Lock()
+            self._summary_lock_loop = loop
+        return self._summary_lock
+
+    def _record_turn(self, query: str, answer: str):
+        """Add a turn to the history, compacting it once the window is full."""
+        self._append_turn(query, answer)
+        if len(self.chat_history) < self.history_window:
+            return
+
+        turns = list(self.chat_history)
+        try:
+            summary = self.summary_llm.invoke(self._summary_prompt(turns)).content
+        except Exception as e:
+            print(f"\n❌ Error: Failed to summarize chat history: {str(e)}")
+            self._trim_history()
+            return
+        self._apply_summary(turns, summary)
+
+    async def _arecord_turn(self, query: str, answer: str):
+        """Asynchronously add a turn to the history, compacting it once the window is full."""
+        self._append_turn(query, answer)
+        if len(self.chat_history) < self.history_window:
+            return
+
+        async with self._get_summary_lock():
+            # A compaction that finished while waiting may have covered these turns
+            if len(self.chat_history) < self.history_window:
+                return
+
+            turns = list(self.chat_history)
+            try:
+                result = await self.summary_llm.ainvoke(self._summary_prompt(turns))
+            except Exception as e:
+                print(f"\n❌ Error: Failed to summarize chat history: {str(e)}")
+                self._trim_history()
+                return
+            self._apply_summary(turns, result.content)
 
     def chat(self, query: str) -> str:
         """
         Process user query and return analysis results.
         
+        Answers are cached per question. Follow-ups are cached under a
+        standalone rewrite made by the summary model, so a question asked
+        again later in the conversation is still answered from the cache.
+        
+        Args:
+            query (str): User's natural language question about the data
+            
+        Returns:
+            str: Agent's response with analysis results
+        """
+        print(f"\n🤖 User Question: {query}")
+
+        try:
+            # Answer from cache when the same or a similar question was already
+            # asked; follow-ups are looked up as standalone questions
+            key, embedding, cached = self._lookup_cache(query)
+            if cached is not None:
+                print("\n⚡ Answered from cache.")
+                self._record_turn(query, cached)
+                return cached
+
+            # Execute query
+            output = self._run_agent(query)
+
+            # Save to chat history and cache
+            self._record_turn(query, output)
+            if embedding is not None:
+                self.cache.add(embedding, key, output)
+
+            return output
+
+        except Exception as e:
+            error_msg = f"Execution error: {str(e)}"
+            print(f"\n❌ Error: {error_msg}")
+
+            # Add error to history for future reference
+            self._record_turn(query, error_msg)
+            return error_msg
+
+    def chat_stream(self, query: str) -> Iterator[str]:
+        """
+        Process user query and stream the response as it is generated.
+        
+        Only the final answer is streamed; text of model calls that end in a
+        tool call is dropped. Requires the language model to be created with
+        streaming enabled; otherwise the full response is yielded once the
+        agent finishes.
+        
+        Status messages and the response header are printed from the
+        consumer's thread before the first chunk, so they never interleave
+        with the streamed answer.
+        
+        Args:
+            query (str): User's natural language question about the data
+            
+        Yields:
+            str: Chunks of the agent's response
+        """
+        print(f"\n🤖 User Question: {query}")
+
+        try:
+            # Answer from cache when the same or a similar question was already
+            # asked; follow-ups are looked up as standalone questions
+            key, embedding, cached = self._lookup_cache(query)
+        except Exception as e:
+            error_msg = f"Execution error: {str(e)}"
+            print(f"\n❌ Error: {error_msg}")
+            self._record_turn(query, error_msg)
+            print(RESPONSE_HEADER)
+            yield error_msg
+            return
+
+        if cached is not None:
+            print("\n⚡ Answered from cache.")
+            self._record_turn(query, cached)
+            print(RESPONSE_HEADER)
+            yield cached
+            return
+
+        # Run the agent in the background and forward tokens as they arrive
+        tokens: queue.Queue = queue.Queue()
+        handler = _TokenQueueHandler(tokens)
+        result = {}
+
+        def run():
+            try:
+                result["output"] = self._run_agent(
+                    query, callbacks=[handler], executor=self.stream_executor,
+                    report=handler.status
+                )
+            except Exception as e:
+                result["error"] = e
+            finally:
+                tokens.put(None)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        header_shown = False
+        while True:
+            item = tokens.get()
+            if item is None:
+                break
+            kind, text = item
+            if kind == "status":
+                print(text)
+                continue
+            if not header_shown:
+                print(RESPONSE_HEADER)
+                header_shown = True
+            yield text
+        thread.join()
+
+        if "error" in result:
+            error_msg = f"Execution error: {str(result['error'])}"
+            print(f"\n❌ Error: {error_msg}")
+
+            # Add error to history for future reference
+            self._record_turn(query, error_msg)
+            if not header_shown:
+                print(RESPONSE_HEADER)
+            yield error_msg
+            return
+
+        # Save to chat history and cache
+        output = result["output"]
+        self._record_turn(query, output)
+        if embedding is not None:
+            self.cache.add(embedding, key, output)
+
+        # Make the streamed text add up to the recorded answer
+        if not header_shown:
+            print(RESPONSE_HEADER)
+        if output.startswith(handler.text):
+            if output[len(handler.text):]:
+                yield output[len(handler.text):]
+        else:
+            yield "\n" + output
+
+    async def achat(self, query: str, with_history: bool = True) -> str:
+        """
+        Asynchronously process user query and return analysis results.
+        
+        If the same question is already being processed, waits for that
+        result instead of running the agent again.
+        
+        Args:
+            query (str): User's natural language question about the data
+            with_history (bool): Whether to use and update the conversation
+                history; independent questions pass False
+            
+        Returns:
+            str: Agent's response with analysis results
+        """
+        key = hashlib.sha1(
+            f"{with_history}:{SemanticCache.normalize_query(query)}".encode()
+        ).hexdigest()
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The caller running the query was cancelled, not this one;
+                # run the query here instead
+                return await self.achat(query, with_history)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            output = await self._achat(query, with_history)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(output)
+        return output
+
+    async def _achat(self, query: str, with_history: bool = True) -> str:
+        """
+        Asynchronously process user query without coalescing duplicates.
+        
         Args:
             query (str): User's natural language question about the data
+            with_history (bool): Whether to use and update the conversation history
             
         Returns:
             str: Agent's response with analysis results
@@ -96,42 +793,92 @@ class DataAnalysisAgent:
         print(f"\n🤖 User Question: {query}")
 
         try:
-            # Prepare input parameters
-            inputs = {
-                "csv_file_path": self.csv_file_path,
-                "tools": "Python_REPL",
-                "chat_history": self.chat_history,
-                "tool_names": self._get_tool_descriptions(),
-                "query": query,
-                "agent_scratchpad": "",
-            }
+            # Answer from cache when the same or a similar question was already
+            # asked; follow-ups are looked up as standalone questions
+            key, embedding, cached = await self._alookup_cache(query, with_history)
+            if cached is not None:
+                print("\n⚡ Answered from cache.")
+                if with_history:
+                    await self._arecord_turn(query, cached)
+                return cached
 
             # Execute query
-            response = self.agent_executor.invoke(inputs)
+            output = await self._arun_agent(query, with_history)
 
-            # Save to chat history
-            self.chat_history.append((query, response['output']))
+            # Save to chat history and cache
+            if with_history:
+                await self._arecord_turn(query, output)
+            if embedding is not None:
+                self.cache.add(embedding, key, output)
 
-            return response['output']
+            return output
 
         except Exception as e:
             error_msg = f"Execution error: {str(e)}"
             print(f"\n❌ Error: {error_msg}")
 
             # Add error to history for future reference
-            self.chat_history.append((query, error_msg))
+            if with_history:
+                await self._arecord_turn(query, error_msg)
             return error_msg
 
+    async def chat_many(self, queries: List[str], max_concurrency: int = 4) -> List[str]:
+        """
+        Process several independent queries concurrently.
+        
+        The queries neither see nor update the conversation history, so each
+        answer is independent of the others and of their order.
+        
+        Args:
+            queries (List[str]): User questions about the data
+            max_concurrency (int): Maximum number of queries in flight, to stay
+                within the provider's rate limits
+            
+        Returns:
+            List[str]: Agent responses, in the same order as the queries
+            
+        Raises:
+            ValueError: If max_concurrency is less than 1
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(query: str) -> str:
+            async with semaphore:
+                return await self.achat(query, with_history=False)
+
+        return await asyncio.gather(*(run(q) for q in queries))
+
     def clear_history(self):
         """Clear chat history."""
-        self.chat_history = []
+        self.chat_history.clear()
+        self._summary = ""
+        self._history_messages = []
+        self.save_cache()
         print("✅ Chat history cleared.")
 
+    def close(self):
+        """Shut down the Python kernel."""
+        if self.kernel is not None:
+            self.kernel.shutdown()
+            self.kernel = None
+
+    def save_cache(self):
+        """Persist the semantic response cache to disk."""
+        try:
+            self.cache.save()
+        except OSError as e:
+            print(f"\n❌ Error: Failed to save cache: {str(e)}")
+
     def get_history(self) -> List[Tuple[str, str]]:
         """
         Get current chat history.
         
+        Only the recent turns that have not yet been compacted into the
+        conversation summary are returned.
+        
         Returns:
             List[Tuple[str, str]]: List of (question, answer) pairs
         """
-        return self.chat_history
\ No newline at end of file
+        return list(self.chat_history)
\ No newline at end of file
@@ -0,0 +1,337 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches concurrent embedding requests.
+
+    Texts queued within a short window are embedded with a single API call,
+    so concurrent queries share one round trip.
+    """
+
+    def __init__(self, embeddings, max_batch_size: int = 32, max_wait: float = 0.01):
+        """
+        Initialize the batcher.
+
+        Args:
+            embeddings: Embedding model instance (e.g., OpenAIEmbeddings)
+            max_batch_size (int): Maximum number of texts per API call
+            max_wait (float): Seconds to wait for more texts before sending a batch
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a text as part of the next batch.
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            List[float]: Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker.done():
+            # Queues and tasks belong to one event loop; start fresh per loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        """Collect queued texts into batches and embed them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                vectors = await self.embeddings.aembed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+
+class SemanticCache:
+    """
+    Embedding-based cache of agent responses.
+
+    Queries are embedded and compared by cosine similarity against previously
+    answered queries for the same CSV file, so repeated or paraphrased questions
+    can be answered without running the agent again. Similarity search uses an
+    in-memory FAISS inner-product index over the normalized embeddings. Exact
+    repeats are answered from a hash table first, without an embedding call.
+
+    The cache is persisted as two append-only files shared by all CSV files:
+    raw float32 embeddings in "<cache_path>.emb", memory-mapped on load, and
+    one JSON record per embedding row in "<cache_path>.jsonl".
+    """
+
+    def __init__(self, embeddings, csv_file_path: str, cache_path: str = "cache",
+                 threshold: float = 0.92):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            embeddings: Embedding model instance (e.g., OpenAIEmbeddings)
+            csv_file_path (str): Path of the CSV file the cached answers refer to
+            cache_path (str): Base path of the cache files
+            threshold (float): Minimum cosine similarity for a cache hit
+        """
+        self.embeddings = embeddings
+        self.csv_file_path = csv_file_path
+        self.cache_path = cache_path
+        self.emb_path = f"{cache_path}.emb"
+        self.meta_path = f"{cache_path}.jsonl"
+        self.threshold = threshold
+        self.entries: List[Tuple[str, str]] = []
+        self.index: Optional[faiss.Index] = None
+        self._pending: List[Tuple[np.ndarray, str, str]] = []
+        self._exact: Dict[str, str] = {}
+        self._batcher = EmbeddingBatcher(embeddings)
+        self.load()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase the query and collapse whitespace."""
+        return " ".join(query.lower().split())
+
+    @classmethod
+    def _exact_key(cls, query: str) -> str:
+        """Hash the normalized query for the exact-match tier."""
+        return hashlib.blake2b(cls.normalize_query(query).encode(), digest_size=16).hexdigest()
+
+    def lookup_exact(self, query: str) -> Optional[str]:
+        """
+        Find the cached response of the same query, without embedding it.
+
+        Args:
+            query (str): User's natural language question
+
+        Returns:
+            Optional[str]: Cached response, or None if the query was not seen
+        """
+        return self._exact.get(self._exact_key(query))
+
+    def embed(self, query: str) -> np.ndarray:
+        """
+        Embed a query as a unit-length vector.
+
+        Args:
+            query (str): User's natural language question
+
+        Returns:
+            np.ndarray: Normalized embedding vector
+        """
+        vector = self.embeddings.embed_query(self.normalize_query(query))
+        return self._to_unit(vector)
+
+    async def aembed(self, query: str) -> np.ndarray:
+        """
+        Asynchronously embed a query as a unit-length vector.
+
+        Concurrent calls are batched into a single embedding request.
+
+        Args:
+            query (str): User's natural language question
+
+        Returns:
+            np.ndarray: Normalized embedding vector
+        """
+        vector = await self._batcher.embed(self.normalize_query(query))
+        return self._to_unit(vector)
+
+    @staticmethod
+    def _to_unit(vector) -> np.ndarray:
+        """Convert an embedding to a normalized float32 array."""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: np.ndarray, query: Optional[str] = None) -> Optional[str]:
+        """
+        Find the cached response of the most similar query.
+
+        Args:
+            embedding (np.ndarray): Normalized query embedding
+            query (Optional[str]): Query text; on a hit it is added to the
+                exact-match tier
+
+        Returns:
+            Optional[str]: Cached response, or None if no entry is similar enough
+        """
+        if self.index is None or self.index.ntotal == 0:
+            return None
+
+        scores, ids = self.index.search(embedding.reshape(1, -1), 1)
+        if ids[0, 0] >= 0 and scores[0, 0] >= self.threshold:
+            response = self.entries[ids[0, 0]][1]
+            if query is not None:
+                self._exact[self._exact_key(query)] = response
+            return response
+        return None
+
+    def add(self, embedding: np.ndarray, query: str, response: str):
+        """Store a query and its response."""
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(embedding.shape[0])
+        self.index.add(embedding.reshape(1, -1))
+        self.entries.append((self.normalize_query(query), response))
+        self._exact[self._exact_key(query)] = response
+        self._pending.append((embedding, self.normalize_query(query), response))
+
+    @staticmethod
+    def _parse_record(line: str) -> Optional[dict]:
+        """
+        Parse one metadata line.
+
+        Args:
+            line (str): Line of the JSONL metadata file
+
+        Returns:
+            Optional[dict]: The record, or None if the line is torn or malformed
+        """
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+
+        if not isinstance(record, dict):
+            return None
+        for key, kind in (("csv_file_path", str), ("query", str), ("response", str),
+                          ("offset", int), ("dim", int)):
+            if not isinstance(record.get(key), kind):
+                return None
+        if record["offset"] < 0 or record["dim"] <= 0:
+            return None
+        return record
+
+    def load(self):
+        """Load cached entries for the current CSV file from disk."""
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.emb_path)):
+            return
+
+        records = []
+        skipped = 0
+        try:
+            with open(self.meta_path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = self._parse_record(line)
+                    if record is None:
+                        skipped += 1
+                    elif record["csv_file_path"] == self.csv_file_path:
+                        records.append(record)
+            # Ignore a trailing partial float left by a torn write
+            count = os.path.getsize(self.emb_path) // 4
+            if not records or count == 0:
+                return
+
+            data = np.memmap(self.emb_path, dtype=np.float32, mode="r", shape=(count,))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load cache '{self.cache_path}': {str(e)}")
+            return
+
+        if skipped:
+            print(f"⚠️ Skipped {skipped} malformed line(s) in '{self.meta_path}'")
+
+        # Each record points at its embedding by byte offset; skip any whose
+        # embedding was not fully written or has a different size
+        dim = records[-1]["dim"]
+        vectors = []
+        for record in records:
+            start, misaligned = divmod(record["offset"], 4)
+            if misaligned or record["dim"] != dim or start + dim > data.shape[0]:
+                continue
+            vectors.append(data[start:start + dim])
+            self.entries.append((record["query"], record["response"]))
+            self._exact[self._exact_key(record["query"])] = record["response"]
+
+        if vectors:
+            self.index = faiss.IndexFlatIP(dim)
+            self.index.add(np.stack(vectors))
+
+    def _records_end(self) -> int:
+        """
+        Find where the embeddings listed in the metadata file end.
+
+        Returns:
+            int: Byte offset just past the last listed embedding
+        """
+        end = 0
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    record = self._parse_record(line) if line.strip() else None
+                    if record is not None:
+                        end = max(end, record["offset"] + 4 * record["dim"])
+        return end
+
+    def save(self):
+        """Append entries added since the last save to the cache files."""
+        if not self._pending:
+            return
+
+        # Drop bytes past the last listed embedding, such as a torn vector or
+        # one whose metadata was never written, so new offsets stay aligned
+        if os.path.exists(self.emb_path):
+            end = self._records_end()
+            if os.path.getsize(self.emb_path) > end:
+                os.truncate(self.emb_path, end)
+
+        records = []
+        with open(self.emb_path, "ab") as f:
+            for embedding, query, response in self._pending:
+                records.append({
+                    "csv_file_path": self.csv_file_path,
+                    "query": query,
+                    "response": response,
+                    "offset": f.tell(),
+                    "dim": int(embedding.shape[0]),
+                })
+                f.write(embedding.astype(np.float32).tobytes())
+
+        # A torn last line must not be joined with the first new record
+        needs_newline = False
+        if os.path.exists(self.meta_path) and os.path.getsize(self.meta_path) > 0:
+            with open(self.meta_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+
+        with open(self.meta_path, "a", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\n")
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+        self._pending = []
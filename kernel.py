@@ -0,0 +1,228 @@
+import asyncio
+import base64
+import os
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+from jupyter_client import KernelManager
+from langchain.tools import Tool
+from langchain_experimental.tools.python.tool import sanitize_input
+
+
+class PythonKernel:
+    """
+    Persistent IPython kernel running in a separate process.
+
+    Code runs outside the agent process, so heavy analysis does not hold the
+    agent's GIL or block its event loop, and variables and imports persist
+    between executions.
+    """
+
+    def __init__(self, cwd: Optional[str] = None, timeout: float = 120):
+        """
+        Start the kernel.
+
+        Args:
+            cwd (Optional[str]): Working directory of the kernel process
+            timeout (float): Seconds an execution may run in total before it is interrupted
+        """
+        self.timeout = timeout
+        self.cwd = cwd or os.getcwd()
+        self.figure_dir = os.path.join(self.cwd, "figures")
+        self.km = KernelManager()
+        self.km.start_kernel(cwd=self.cwd)
+        self.kc = self.km.client()
+        self.kc.start_channels()
+        self.kc.wait_for_ready(timeout=60)
+
+        # Code re-run after the kernel is restarted, set by setup()
+        self.setup_cells: Tuple[str, ...] = ()
+
+        # The kernel runs one cell at a time; serialize callers so each one
+        # reads only the output of its own execution
+        self._lock = threading.Lock()
+
+    def execute(self, code: str) -> Tuple[str, bool]:
+        """
+        Execute code in the kernel and collect its output.
+
+        Args:
+            code (str): Python code to execute
+
+        Returns:
+            Tuple[str, bool]: Printed output, results and errors of the
+                execution, and whether it finished without an error
+        """
+        with self._lock:
+            return self._execute(code)
+
+    def _execute(self, code: str) -> Tuple[str, bool]:
+        """Execute code in the kernel; the caller holds the lock."""
+        # Cells are independent, so an error must not abort later requests
+        msg_id = self.kc.execute(code, stop_on_error=False)
+        deadline = time.monotonic() + self.timeout
+        outputs = []
+        ok = True
+        while True:
+            try:
+                msg = self.kc.get_iopub_msg(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                self.km.interrupt_kernel()
+                outputs.append(f"Execution timed out after {self.timeout} seconds.")
+                if not self._wait_for_idle(msg_id):
+                    outputs.append("\n" + self._restart())
+                    return "".join(outputs), False
+                ok = False
+                break
+
+            if msg["parent_header"].get("msg_id") != msg_id:
+                continue
+
+            msg_type = msg["msg_type"]
+            content = msg["content"]
+            if msg_type == "stream":
+                outputs.append(content["text"])
+            elif msg_type in ("execute_result", "display_data"):
+                if "image/png" in content["data"]:
+                    path = self._save_figure(content["data"]["image/png"])
+                    outputs.append(f"Figure saved to {path}\n")
+                else:
+                    outputs.append(content["data"].get("text/plain", "") + "\n")
+            elif msg_type == "error":
+                ok = False
+                outputs.append(f"{content['ename']}: {content['evalue']}\n")
+            elif msg_type == "status" and content["execution_state"] == "idle":
+                break
+
+        # Consume the shell reply so replies do not pile up in the client;
+        # stale replies left by earlier executions are discarded here too
+        while True:
+            try:
+                reply = self.kc.get_shell_msg(timeout=max(deadline - time.monotonic(), 1))
+            except queue.Empty:
+                break
+            if reply["parent_header"].get("msg_id") == msg_id:
+                break
+
+        return "".join(outputs), ok
+
+    def _save_figure(self, data: str) -> str:
+        """
+        Write an inline PNG figure to the figure directory.
+
+        Args:
+            data (str): Base64-encoded PNG image
+
+        Returns:
+            str: Path of the figure, relative to the working directory
+        """
+        os.makedirs(self.figure_dir, exist_ok=True)
+        n = 1
+        while os.path.exists(os.path.join(self.figure_dir, f"figure_{n}.png")):
+            n += 1
+        path = os.path.join(self.figure_dir, f"figure_{n}.png")
+        with open(path, "wb") as f:
+            f.write(base64.b64decode(data))
+        return os.path.relpath(path, self.cwd)
+
+    def _wait_for_idle(self, msg_id: str, timeout: float = 10) -> bool:
+        """
+        Discard output of an interrupted execution until the kernel is idle.
+
+        Returns:
+            bool: Whether the kernel became idle within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                msg = self.kc.get_iopub_msg(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return False
+            if (msg["parent_header"].get("msg_id") == msg_id
+                    and msg["msg_type"] == "status"
+                    and msg["content"]["execution_state"] == "idle"):
+                return True
+
+    def _restart(self) -> str:
+        """
+        Restart a kernel that ignores interrupts, e.g. inside compiled code.
+
+        The setup cells are run again in the new kernel; the caller holds
+        the lock.
+
+        Returns:
+            str: Notice describing the reset, for the tool output
+        """
+        self.km.restart_kernel(now=True)
+        self.kc.wait_for_ready(timeout=60)
+        for code in self.setup_cells:
+            output, ok = self._execute(code)
+            if not ok:
+                return f"The kernel was restarted, but its setup failed: {output.strip()}"
+        return (
+            "The kernel did not respond to the interrupt and was restarted. "
+            "All variables were reset; the initial setup was run again, so "
+            "anything defined since then must be recreated."
+        )
+
+    def setup(self, *cells: str) -> Tuple[str, bool]:
+        """
+        Run setup code, and run it again whenever the kernel is restarted.
+
+        Args:
+            *cells (str): Code cells to execute in order
+
+        Returns:
+            Tuple[str, bool]: Output of the first failing cell, or of the
+                last cell, and whether all cells finished without an error
+        """
+        with self._lock:
+            self.setup_cells = cells
+            output, ok = "", True
+            for code in cells:
+                output, ok = self._execute(code)
+                if not ok:
+                    break
+            return output, ok
+
+    def run(self, code: str) -> str:
+        """
+        Execute code in the kernel and collect its output.
+
+        Args:
+            code (str): Python code to execute
+
+        Returns:
+            str: Printed output, results and errors of the execution
+        """
+        return self.execute(code)[0]
+
+    async def arun(self, code: str) -> str:
+        """Execute code in the kernel without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run, code)
+
+    def as_tool(self) -> Tool:
+        """
+        Wrap the kernel as a LangChain tool.
+
+        Returns:
+            Tool: Python execution tool backed by this kernel
+        """
+        return Tool(
+            name="Python_REPL",
+            description=(
+                "A Python shell. Use this to execute python commands. Input should be a valid "
+                "python command. If you want to see the output of a value, you should print it "
+                "out with `print(...)`."
+            ),
+            func=lambda code: self.run(sanitize_input(code)),
+            coroutine=lambda code: self.arun(sanitize_input(code)),
+        )
+
+    def shutdown(self):
+        """Stop the kernel process."""
+        self.kc.stop_channels()
+        self.km.shutdown_kernel(now=True)
@@ -6,16 +6,30 @@ This script demonstrates how to use the DataAnalysisAgent to interact with CSV d
 using natural language queries.
 """
 
+import argparse
+import asyncio
+import functools
 import os
+import sys
+import httpx
+import openai
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from agent import DataAnalysisAgent
 
+# Read the .env file once at import, and only when the key is not already set
+if not os.getenv("OPENAI_API_KEY"):
+    load_dotenv()
+
+# HTTP/2 connection pools shared by every OpenAI client, so concurrent
+# requests reuse open TLS sessions instead of reconnecting
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+HTTP_CLIENT = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=60)
+HTTP_ASYNC_CLIENT = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=60)
+
 
 def load_environment():
-    """Load environment variables from .env file."""
-    load_dotenv()
-    
+    """Get the OpenAI API key from the environment."""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables. Please check your .env file.")
@@ -23,10 +37,31 @@ def load_environment():
     return api_key
 
 
+@functools.lru_cache(maxsize=4)
+def initialize_openai_clients(api_key: str):
+    """
+    Initialize the OpenAI API clients on the shared connection pools.
+    
+    Args:
+        api_key (str): OpenAI API key
+        
+    Returns:
+        Tuple[openai.OpenAI, openai.AsyncOpenAI]: Sync and async clients
+    """
+    return (
+        openai.OpenAI(api_key=api_key, http_client=HTTP_CLIENT),
+        openai.AsyncOpenAI(api_key=api_key, http_client=HTTP_ASYNC_CLIENT)
+    )
+
+
+@functools.lru_cache(maxsize=4)
 def initialize_llm(api_key: str, model: str = "gpt-4o", temperature: float = 0):
     """
     Initialize the language model.
     
+    Results are cached, so repeated calls with the same settings reuse one
+    client instead of rebuilding it.
+    
     Args:
         api_key (str): OpenAI API key
         model (str): Model name to use
@@ -35,10 +70,36 @@ def initialize_llm(api_key: str, model: str = "gpt-4o", temperature: float = 0):
     Returns:
         ChatOpenAI: Initialized language model
     """
+    client, async_client = initialize_openai_clients(api_key)
+
     return ChatOpenAI(
         model=model,
         temperature=temperature,
-        api_key=api_key
+        api_key=api_key,
+        streaming=True,
+        client=client.chat.completions,
+        async_client=async_client.chat.completions
+    )
+
+
+def initialize_embeddings(api_key: str, model: str = "text-embedding-3-small"):
+    """
+    Initialize the embedding model used by the response cache.
+    
+    Args:
+        api_key (str): OpenAI API key
+        model (str): Embedding model name to use
+        
+    Returns:
+        OpenAIEmbeddings: Initialized embedding model
+    """
+    client, async_client = initialize_openai_clients(api_key)
+
+    return OpenAIEmbeddings(
+        model=model,
+        api_key=api_key,
+        client=client.embeddings,
+        async_client=async_client.embeddings
     )
 
 
@@ -55,14 +116,67 @@ def print_welcome_message():
     print("=" * 50)
 
 
+def positive_int(value: str) -> int:
+    """Parse a command line integer that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Data Analysis Agent")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Answer the questions in FILE (one per line) concurrently and exit"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=positive_int,
+        default=4,
+        help="Maximum number of batch questions processed at once (default: 4)"
+    )
+    return parser.parse_args()
+
+
+def run_batch(agent: DataAnalysisAgent, batch_file: str, max_concurrency: int):
+    """
+    Answer all questions from a file concurrently.
+    
+    Args:
+        agent (DataAnalysisAgent): Initialized data analysis agent
+        batch_file (str): Path to a text file with one question per line
+        max_concurrency (int): Maximum number of questions in flight
+    """
+    with open(batch_file, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+
+    if not questions:
+        print(f"No questions found in '{batch_file}'.")
+        return
+
+    responses = asyncio.run(agent.chat_many(questions, max_concurrency=max_concurrency))
+    agent.save_cache()
+
+    for i, (question, response) in enumerate(zip(questions, responses), 1):
+        print(f"\n{i}. Q: {question}")
+        print(f"📊 Agent Response:\n{response}")
+
+
 def main():
     """Main function to run the interactive data analysis agent."""
+    args = parse_args()
+
     try:
         # Load environment variables
         api_key = load_environment()
         
-        # Initialize language model
+        # Initialize language models: a cheap one for tool-calling steps and
+        # a stronger one for answer synthesis
         llm = initialize_llm(api_key)
+        planner_llm = initialize_llm(api_key, model="gpt-4o-mini")
         
         # CSV file path (modify this according to your data file)
         csv_file_path = "data.csv"  # Change this to your CSV file path
@@ -76,9 +190,17 @@ def main():
         # Create data analysis agent
         agent = DataAnalysisAgent(
             llm=llm,
-            csv_file_path=csv_file_path
+            csv_file_path=csv_file_path,
+            planner_llm=planner_llm,
+            summary_llm=planner_llm,
+            embeddings=initialize_embeddings(api_key)
         )
         
+        # Answer batch questions without entering the interactive loop
+        if args.batch:
+            run_batch(agent, args.batch, args.max_concurrency)
+            return
+        
         # Print welcome message
         print_welcome_message()
         
@@ -88,6 +210,7 @@ def main():
                 user_input = input("\n💬 Enter your question (type 'quit' to exit): ")
                 
                 if user_input.lower() in ['quit', 'exit', 'q']:
+                    agent.save_cache()
                     print("👋 Goodbye!")
                     break
                 
@@ -110,11 +233,14 @@ def main():
                     print("Please enter a valid question.")
                     continue
                 
-                # Process the query
-                response = agent.chat(user_input)
-                print(f"\n📊 Agent Response:\n{response}")
+                # Process the query, printing the response as it streams in
+                for chunk in agent.chat_stream(user_input):
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                print()
                 
             except KeyboardInterrupt:
+                agent.save_cache()
                 print("\n👋 Goodbye!")
                 break
             except Exception as e:
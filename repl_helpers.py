@@ -0,0 +1,111 @@
+"""
+Helpers preloaded into the Python tool namespace of the Data Analysis Agent.
+
+Numba compiled helpers are cached under a project-local directory, so the
+JIT compilation cost is paid once rather than on every start.
+"""
+
+import os
+
+os.environ.setdefault(
+    "NUMBA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".numba_cache")
+)
+
+import numpy as np
+from numba import njit, prange
+
+
+def pairwise_corr(X):
+    """
+    Compute the Pearson correlation matrix of the columns of a 2D array.
+
+    Like DataFrame.corr(), rows with NaN are skipped per column pair, and
+    pairs with fewer than two rows or zero variance give NaN. Without NaN
+    this is np.corrcoef; with NaN a parallel compiled loop is used.
+
+    Args:
+        X (np.ndarray): Numeric array of shape (rows, columns)
+
+    Returns:
+        np.ndarray: Correlation matrix of shape (columns, columns)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if not np.isnan(X).any():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.atleast_2d(np.corrcoef(X, rowvar=False))
+    return _pairwise_corr_nan(X)
+
+
+@njit(parallel=True, cache=True)
+def _pairwise_corr_nan(X):
+    """Pairwise-complete Pearson correlation of the columns of X."""
+    # Work on contiguous columns so the inner loops read memory sequentially
+    C = np.ascontiguousarray(X.T)
+    m, n = C.shape
+    out = np.empty((m, m))
+    for i in prange(m):
+        for j in range(i, m):
+            count = 0
+            sum_x = 0.0
+            sum_y = 0.0
+            for k in range(n):
+                x = C[i, k]
+                y = C[j, k]
+                if not (np.isnan(x) or np.isnan(y)):
+                    count += 1
+                    sum_x += x
+                    sum_y += y
+
+            r = np.nan
+            if count > 1:
+                mean_x = sum_x / count
+                mean_y = sum_y / count
+                sxx = 0.0
+                syy = 0.0
+                sxy = 0.0
+                for k in range(n):
+                    x = C[i, k]
+                    y = C[j, k]
+                    if not (np.isnan(x) or np.isnan(y)):
+                        dx = x - mean_x
+                        dy = y - mean_y
+                        sxx += dx * dx
+                        syy += dy * dy
+                        sxy += dx * dy
+                if sxx > 0.0 and syy > 0.0:
+                    r = sxy / np.sqrt(sxx * syy)
+
+            # Only the upper triangle is computed; mirror it
+            out[i, j] = r
+            out[j, i] = r
+    return out
+
+
+def group_agg(df, key, col, fn="mean"):
+    """
+    Aggregate a column per group with a vectorized groupby.
+
+    Args:
+        df (pd.DataFrame): Data to aggregate
+        key: Column name(s) to group by
+        col: Column name(s) to aggregate
+        fn: Aggregation function or name (e.g., "mean", "sum", "count")
+
+    Returns:
+        pd.Series | pd.DataFrame: Aggregated values per group
+    """
+    return df.groupby(key)[col].agg(fn)
+
+
+def numeric_matrix(df):
+    """
+    Get the numeric columns of a DataFrame as a NumPy array.
+
+    Args:
+        df (pd.DataFrame): Data to convert
+
+    Returns:
+        np.ndarray: Array of shape (rows, numeric columns)
+    """
+    return df.select_dtypes("number").to_numpy()